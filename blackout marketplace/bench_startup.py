@@ -0,0 +1,58 @@
+"""Measure cold-start cost of one of the Flask apps.
+
+Every run starts a fresh interpreter inside the app folder, so nothing is
+shared between runs, and times:
+
+- import:        importing app.py
+- create_app:    building the app and binding the extensions
+- warmup:        the pre-fork warmup hook
+- first_request: the first GET of a page, with and without warmup
+
+Usage:
+    python bench_startup.py instagram_marketplace
+    python bench_startup.py marketplace_app --runs 10 --path /login
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = '''
+import json, sys, time
+t0 = time.perf_counter()
+import app as module
+t1 = time.perf_counter()
+app = module.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'TESTING': True})
+t2 = time.perf_counter()
+if sys.argv[2] == 'warm':
+    module.warmup(app)
+t3 = time.perf_counter()
+response = app.test_client().get(sys.argv[1])
+t4 = time.perf_counter()
+assert response.status_code < 500, response.status_code
+print(json.dumps({'import': t1 - t0, 'create_app': t2 - t1, 'warmup': t3 - t2, 'first_request': t4 - t3}))
+'''
+
+def run_once(app_dir, path, mode):
+    result = subprocess.run([sys.executable, '-c', CHILD, path, mode], cwd=app_dir,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('app_dir', help='folder containing app.py')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--path', default='/login', help='page requested after start-up')
+    args = parser.parse_args()
+
+    app_dir = os.path.abspath(args.app_dir)
+    for mode in ('cold', 'warm'):
+        samples = [run_once(app_dir, args.path, mode) for _ in range(args.runs)]
+        print(f"{mode} start ({args.runs} runs, median ms):")
+        for key in ('import', 'create_app', 'warmup', 'first_request'):
+            print(f"  {key:<14} {statistics.median(s[key] for s in samples) * 1000:8.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,43 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+from flask import Flask, Blueprint, render_template, request, jsonify, session, redirect, url_for, flash, current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.dialects import postgresql, sqlite
 from datetime import datetime
+import atexit
+import click
 import os
+import threading
+import time
 from werkzeug.utils import secure_filename
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'instagram-marketplace-secret-key'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///instagram_marketplace.db'
-app.config['UPLOAD_FOLDER'] = 'static/uploads'
-app.config['PROFILE_PICS_FOLDER'] = 'static/profile_pics'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+class Config:
+    """Default settings, each overridable through an environment variable."""
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'instagram-marketplace-secret-key')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///instagram_marketplace.db')
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'static/uploads')
+    PROFILE_PICS_FOLDER = os.environ.get('PROFILE_PICS_FOLDER', 'static/profile_pics')
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB max file size
 
-# Ensure upload folders exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs(app.config['PROFILE_PICS_FOLDER'], exist_ok=True)
+    # Buffer like/unlike writes and flush them in batches (see LikeBuffer)
+    LIKE_WRITE_BEHIND = os.environ.get('LIKE_WRITE_BEHIND', 'false').lower() == 'true'
+    LIKE_FLUSH_INTERVAL = float(os.environ.get('LIKE_FLUSH_INTERVAL', 1.0))  # seconds
+    LIKE_FLUSH_MAX_PENDING = int(os.environ.get('LIKE_FLUSH_MAX_PENDING', 500))
+    LIKE_FLUSH_MAX_ATTEMPTS = int(os.environ.get('LIKE_FLUSH_MAX_ATTEMPTS', 5))
 
-db = SQLAlchemy(app)
-bcrypt = Bcrypt(app)
-login_manager = LoginManager(app)
-login_manager.login_view = 'login'
+    # Profile pages: posts per grid page and seconds a header's counts are cached
+    PROFILE_PAGE_SIZE = int(os.environ.get('PROFILE_PAGE_SIZE', 12))
+    PROFILE_HEADER_TTL = float(os.environ.get('PROFILE_HEADER_TTL', 30))
+
+# Extensions are created unbound and attached to an app in create_app()
+db = SQLAlchemy()
+bcrypt = Bcrypt()
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
+
+main = Blueprint('main', __name__)
 
 # Database Models
 class User(db.Model, UserMixin):
@@ -57,7 +74,7 @@ class Post(db.Model):
     description = db.Column(db.Text, nullable=False)
     price = db.Column(db.Integer, nullable=False)  # Price in KES
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
 
     # Relationships
     likes = db.relationship('Like', backref='post', lazy=True, cascade='all, delete-orphan')
@@ -72,6 +89,9 @@ class Post(db.Model):
         return len(self.comments)
 
 class Like(db.Model):
+    # post_id leads so per-post counts can use the key as an index
+    __table_args__ = (db.UniqueConstraint('post_id', 'user_id', name='uq_like_post_id_user_id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
@@ -82,12 +102,14 @@ class Comment(db.Model):
     text = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False, index=True)
 
 class Follow(db.Model):
+    __table_args__ = (db.UniqueConstraint('follower_id', 'followed_id', name='uq_follow_follower_id_followed_id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     follower_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    followed_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    followed_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 @login_manager.user_loader
@@ -98,13 +120,259 @@ def load_user(user_id):
 def save_image(file, folder):
     if file and file.filename:
         filename = secure_filename(f"{datetime.now().timestamp()}_{file.filename}")
-        filepath = os.path.join(app.config[folder], filename)
+        # Upload folders are created on first use rather than at import time
+        os.makedirs(current_app.config[folder], exist_ok=True)
+        filepath = os.path.join(current_app.config[folder], filename)
         file.save(filepath)
         return filename
     return None
 
+def insert_ignore(table):
+    """INSERT that silently skips rows clashing with a unique key."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(table).on_conflict_do_nothing()
+    if dialect == 'sqlite':
+        return sqlite.insert(table).on_conflict_do_nothing()
+    return table.insert().prefix_with('IGNORE')  # MySQL / MariaDB
+
+def write_likes(changes):
+    """Apply ``{(user_id, post_id): liked}`` in one transaction.
+
+    Rows are inserted or deleted against the (user_id, post_id) unique key,
+    so replaying the same change is a no-op.
+    """
+    table = Like.__table__
+    now = datetime.utcnow()
+    added = [{'user_id': u, 'post_id': p, 'created_at': now} for (u, p), liked in changes.items() if liked]
+    removed = [{'uid': u, 'pid': p} for (u, p), liked in changes.items() if not liked]
+    if added:
+        db.session.execute(insert_ignore(table), added)
+    if removed:
+        db.session.execute(
+            table.delete().where((table.c.user_id == bindparam('uid')) & (table.c.post_id == bindparam('pid'))),
+            removed
+        )
+    db.session.commit()
+
+def count_likes(post_id, user_id, liked):
+    """Likes on a post, counting ``user_id``'s own like as ``liked``.
+
+    Stays exact while that user's change is still queued in a LikeBuffer.
+    """
+    others = db.session.query(func.count(Like.id)).filter(Like.post_id == post_id, Like.user_id != user_id).scalar()
+    return others + (1 if liked else 0)
+
+# Characters of a post description sent to profile grid cards
+PROFILE_GRID_DESCRIPTION_LENGTH = 100
+
+class ProfileHeaderCache:
+    """Short-TTL cache of profile header counts, keyed by user id.
+
+    Each app keeps its own in app.extensions, so apps pointing at different
+    databases never share counts. Once ``max_size`` users are cached the
+    oldest entry is evicted.
+    """
+
+    def __init__(self, ttl, max_size=1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}  # {user_id: (expires_at, counts)}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def set(self, user_id, counts):
+        with self._lock:
+            if user_id not in self._entries and len(self._entries) >= self.max_size:
+                self._entries.pop(next(iter(self._entries)), None)
+            self._entries[user_id] = (time.monotonic() + self.ttl, counts)
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+def invalidate_profile_header(*user_ids):
+    current_app.extensions['profile_header_cache'].invalidate(*user_ids)
+
+def profile_header(user_id, viewer_id):
+    """Post, follower and following counts for a profile, plus is_following.
+
+    Everything comes from a single aggregated query. The counts are the same
+    for every viewer and are cached for PROFILE_HEADER_TTL seconds, after
+    which only the viewer's is_following needs to be looked up.
+    """
+    is_following = select(Follow.id).where(
+        (Follow.follower_id == viewer_id) & (Follow.followed_id == user_id)).exists()
+    cache = current_app.extensions['profile_header_cache']
+    cached = cache.get(user_id)
+    if cached:
+        header = dict(cached)
+        header['is_following'] = db.session.query(is_following).scalar()
+        return header
+
+    row = db.session.query(
+        select(func.count(Post.id)).where(Post.user_id == user_id).scalar_subquery().label('posts_count'),
+        select(func.count(Follow.id)).where(Follow.followed_id == user_id).scalar_subquery().label('followers_count'),
+        select(func.count(Follow.id)).where(Follow.follower_id == user_id).scalar_subquery().label('following_count'),
+        is_following.label('is_following')
+    ).one()
+    header = row._asdict()
+    counts = {key: header[key] for key in ('posts_count', 'followers_count', 'following_count')}
+    cache.set(user_id, counts)
+    return header
+
+def profile_posts(user_id, before=None, limit=12):
+    """One keyset page of a profile grid, newest first.
+
+    Returns ``(posts, next_before)``. Rows carry only the fields the grid
+    shows: a description prefix rather than the full text, and like and
+    comment counts as subqueries rather than loaded collections. Pass ``next_before`` back as ``before`` for the next page.
+    """
+    likes_count = select(func.count(Like.id)).where(Like.post_id == Post.id).correlate(Post).scalar_subquery()
+    comments_count = select(func.count(Comment.id)).where(Comment.post_id == Post.id).correlate(Post).scalar_subquery()
+    query = db.session.query(
+        Post.id, Post.image, Post.price,
+        func.substr(Post.description, 1, PROFILE_GRID_DESCRIPTION_LENGTH).label('description'),
+        likes_count.label('likes_count'), comments_count.label('comments_count')
+    ).filter(Post.user_id == user_id)
+    if before is not None:
+        query = query.filter(Post.id < before)
+    posts = query.order_by(Post.id.desc()).limit(limit + 1).all()
+    next_before = posts[limit - 1].id if len(posts) > limit else None
+    return posts[:limit], next_before
+
+class LikeBuffer:
+    """Write-behind buffer for like/unlike events.
+
+    Events are coalesced per (user_id, post_id), so a burst of toggles costs a
+    single write of the final state. Pending changes are flushed by
+    write_likes() once ``max_pending`` pairs are queued or every ``interval``
+    seconds. If a batch fails it is retried row by row; rows that still fail
+    are put back for the next flush and dropped after ``max_attempts`` tries.
+    Each worker process keeps its own buffer; queued changes are lost if the
+    process is killed before a flush.
+    """
+
+    def __init__(self, app, interval=1.0, max_pending=500, max_attempts=5):
+        self.app = app
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._pending = {}
+        self._flushing = {}  # Batch currently being written
+        self._attempts = {}  # Failed writes so far, per pair
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid = None
+        atexit.register(self.flush)
+
+    def add(self, user_id, post_id, liked):
+        with self._lock:
+            self._pending[(user_id, post_id)] = liked
+            full = len(self._pending) >= self.max_pending
+            # Started lazily so every forked worker gets its own flusher thread
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, daemon=True).start()
+        if full:
+            self.flush()
+
+    def pending(self, user_id, post_id):
+        """Queued or in-flight state for the pair, or None if nothing is waiting."""
+        key = (user_id, post_id)
+        with self._lock:
+            return self._pending.get(key, self._flushing.get(key))
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                changes, self._pending = self._pending, {}
+                self._flushing = changes
+            if not changes:
+                return
+            with self.app.app_context():
+                try:
+                    try:
+                        write_likes(changes)
+                        failed = {}
+                    except Exception:
+                        db.session.rollback()
+                        self.app.logger.exception('Like buffer flush of %d changes failed; retrying row by row', len(changes))
+                        failed = self._write_rows(changes)
+                    self._requeue(changes, failed)
+                finally:
+                    with self._lock:
+                        self._flushing = {}
+
+    def _write_rows(self, changes):
+        """Write each change in its own transaction; returns the ones that failed."""
+        failed = {}
+        for key, liked in changes.items():
+            try:
+                write_likes({key: liked})
+            except Exception:
+                db.session.rollback()
+                failed[key] = liked
+        return failed
+
+    def _requeue(self, changes, failed):
+        with self._lock:
+            for key in changes:
+                if key not in failed:
+                    self._attempts.pop(key, None)
+            for key, liked in failed.items():
+                if key in self._pending:
+                    # Queued since the swap, so newer; it starts its own attempt count
+                    self._attempts.pop(key, None)
+                    continue
+                attempts = self._attempts.get(key, 0) + 1
+                if attempts >= self.max_attempts:
+                    self._attempts.pop(key, None)
+                    self.app.logger.error('Dropping like change %r -> %s after %d failed writes', key, liked, attempts)
+                else:
+                    self._attempts[key] = attempts
+                    self._pending[key] = liked
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+def upgrade_db():
+    """Bring a database created by an older version up to date.
+
+    db.create_all() never adds constraints or indexes to existing tables.
+    Without the like/follow unique keys ON CONFLICT DO NOTHING has nothing to
+    conflict with, so duplicate rows are removed, keeping the oldest, before
+    each unique index is created. The indexes behind the profile header and
+    grid counts are added as well. Safe to run more than once.
+    """
+    for table, columns in (('like', ('post_id', 'user_id')), ('follow', ('follower_id', 'followed_id'))):
+        column_list = ', '.join(columns)
+        db.session.execute(db.text(
+            f'DELETE FROM "{table}" WHERE id NOT IN (SELECT MIN(id) FROM "{table}" GROUP BY {column_list})'))
+        db.session.execute(db.text(
+            f'CREATE UNIQUE INDEX IF NOT EXISTS uq_{table}_{"_".join(columns)} ON "{table}" ({column_list})'))
+    for table, column in (('post', 'user_id'), ('follow', 'followed_id'), ('comment', 'post_id')):
+        db.session.execute(db.text(f'CREATE INDEX IF NOT EXISTS ix_{table}_{column} ON "{table}" ({column})'))
+    db.session.commit()
+
+@click.command('upgrade-db')
+@with_appcontext
+def upgrade_db_command():
+    """Deduplicate likes and follows and add missing keys and indexes."""
+    upgrade_db()
+    click.echo('Database upgraded.')
+
 # Routes
-@app.route('/')
+@main.route('/')
 @login_required
 def home():
     # Get posts from users that current user follows, plus their own posts
@@ -115,14 +383,14 @@ def home():
 
     return render_template('feed.html', posts=posts)
 
-@app.route('/explore')
+@main.route('/explore')
 @login_required
 def explore():
     # Show all posts for discovery
     posts = Post.query.order_by(Post.created_at.desc()).all()
     return render_template('feed.html', posts=posts, explore=True)
 
-@app.route('/login', methods=['GET', 'POST'])
+@main.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         email = request.form.get('email')
@@ -130,11 +398,11 @@ def login():
         user = User.query.filter_by(email=email).first()
         if user and bcrypt.check_password_hash(user.password, password):
             login_user(user)
-            return redirect(url_for('home'))
+            return redirect(url_for('main.home'))
         flash('Login failed. Check email and password', 'danger')
     return render_template('login.html')
 
-@app.route('/signup', methods=['GET', 'POST'])
+@main.route('/signup', methods=['GET', 'POST'])
 def signup():
     if request.method == 'POST':
         username = request.form.get('username')
@@ -156,50 +424,75 @@ def signup():
         db.session.add(user)
         db.session.commit()
         login_user(user)
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     return render_template('signup.html')
 
-@app.route('/logout')
+@main.route('/logout')
 @login_required
 def logout():
     logout_user()
-    return redirect(url_for('login'))
+    return redirect(url_for('main.login'))
 
-@app.route('/profile/<username>')
+@main.route('/profile/<username>')
 @login_required
 def profile(username):
     user = User.query.filter_by(username=username).first_or_404()
-    posts = Post.query.filter_by(user_id=user.id).order_by(Post.created_at.desc()).all()
-
-    # Check if current user is following this user
-    is_following = Follow.query.filter_by(follower_id=current_user.id, followed_id=user.id).first() is not None
+    header = profile_header(user.id, current_user.id)
+    posts, next_before = profile_posts(user.id, request.args.get('before', type=int),
+                                       current_app.config['PROFILE_PAGE_SIZE'])
     is_own_profile = current_user.id == user.id
 
-    return render_template('profile.html', user=user, posts=posts, is_following=is_following, is_own_profile=is_own_profile)
+    return render_template('profile.html', user=user, header=header, posts=posts, next_before=next_before,
+                           is_following=header['is_following'], is_own_profile=is_own_profile)
+
+def set_follow(follower_id, followed_id, following, commit=True):
+    """Idempotently create or remove a follow; returns True if a row changed.
+
+    With ``commit=False`` the caller commits and invalidates the profile
+    headers, so several changes can share one transaction.
+    """
+    table = Follow.__table__
+    if following:
+        result = db.session.execute(insert_ignore(table).values(
+            follower_id=follower_id, followed_id=followed_id, created_at=datetime.utcnow()))
+    else:
+        result = db.session.execute(table.delete().where(
+            (table.c.follower_id == follower_id) & (table.c.followed_id == followed_id)))
+    if commit:
+        db.session.commit()
+        invalidate_profile_header(follower_id, followed_id)
+    return result.rowcount > 0
 
-@app.route('/follow/<username>', methods=['POST'])
+@main.route('/follow/<username>', methods=['PUT', 'DELETE'])
 @login_required
-def follow(username):
+def set_following(username):
+    # PUT follows, DELETE unfollows; repeating either request changes nothing
     user = User.query.filter_by(username=username).first_or_404()
 
     if user.id == current_user.id:
         return jsonify({'error': 'Cannot follow yourself'}), 400
 
-    existing_follow = Follow.query.filter_by(follower_id=current_user.id, followed_id=user.id).first()
+    following = request.method == 'PUT'
+    set_follow(current_user.id, user.id, following)
+    return jsonify({'following': following, 'followers_count': user.followers_count})
 
-    if existing_follow:
-        # Unfollow
-        db.session.delete(existing_follow)
-        db.session.commit()
-        return jsonify({'following': False, 'followers_count': user.followers_count})
-    else:
-        # Follow
-        follow = Follow(follower_id=current_user.id, followed_id=user.id)
-        db.session.add(follow)
-        db.session.commit()
-        return jsonify({'following': True, 'followers_count': user.followers_count})
+@main.route('/follow/<username>', methods=['POST'])
+@login_required
+def follow(username):
+    # Toggle kept for older clients: unfollow, or follow if there was nothing to delete
+    user = User.query.filter_by(username=username).first_or_404()
+
+    if user.id == current_user.id:
+        return jsonify({'error': 'Cannot follow yourself'}), 400
 
-@app.route('/create_post', methods=['GET', 'POST'])
+    following = not set_follow(current_user.id, user.id, False, commit=False)
+    if following:
+        set_follow(current_user.id, user.id, True, commit=False)
+    db.session.commit()
+    invalidate_profile_header(current_user.id, user.id)
+    return jsonify({'following': following, 'followers_count': user.followers_count})
+
+@main.route('/create_post', methods=['GET', 'POST'])
 @login_required
 def create_post():
     if request.method == 'POST':
@@ -226,38 +519,61 @@ def create_post():
         )
         db.session.add(post)
         db.session.commit()
+        invalidate_profile_header(current_user.id)
 
         flash('Post created successfully!', 'success')
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
     return render_template('create_post.html')
 
-@app.route('/post/<int:post_id>')
+@main.route('/post/<int:post_id>')
 @login_required
 def post_detail(post_id):
     post = Post.query.get_or_404(post_id)
     comments = Comment.query.filter_by(post_id=post_id).order_by(Comment.created_at.asc()).all()
     return render_template('post_detail.html', post=post, comments=comments)
 
-@app.route('/like/<int:post_id>', methods=['POST'])
+@main.route('/like/<int:post_id>', methods=['PUT', 'DELETE'])
 @login_required
-def like_post(post_id):
-    post = Post.query.get_or_404(post_id)
-    existing_like = Like.query.filter_by(user_id=current_user.id, post_id=post_id).first()
-
-    if existing_like:
-        # Unlike
-        db.session.delete(existing_like)
-        db.session.commit()
-        return jsonify({'liked': False, 'likes_count': post.likes_count})
+def set_like(post_id):
+    # PUT likes, DELETE unlikes; repeating either request changes nothing
+    Post.query.get_or_404(post_id)
+    liked = request.method == 'PUT'
+
+    like_buffer = current_app.extensions.get('like_buffer')
+    if like_buffer:
+        like_buffer.add(current_user.id, post_id, liked)
     else:
-        # Like
-        like = Like(user_id=current_user.id, post_id=post_id)
-        db.session.add(like)
-        db.session.commit()
-        return jsonify({'liked': True, 'likes_count': post.likes_count})
+        write_likes({(current_user.id, post_id): liked})
+    return jsonify({'liked': liked, 'likes_count': count_likes(post_id, current_user.id, liked)})
+
+@main.route('/like/<int:post_id>', methods=['POST'])
+@login_required
+def like_post(post_id):
+    # Toggle kept for older clients: unlike, or like if there was nothing to delete
+    Post.query.get_or_404(post_id)
+
+    like_buffer = current_app.extensions.get('like_buffer')
+    if like_buffer:
+        # Toggle from the buffered state; the row is only current if nothing is queued or in flight
+        current = like_buffer.pending(current_user.id, post_id)
+        if current is None:
+            current = db.session.query(Like.id).filter_by(user_id=current_user.id, post_id=post_id).first() is not None
+        liked = not current
+        like_buffer.add(current_user.id, post_id, liked)
+        return jsonify({'liked': liked, 'likes_count': count_likes(post_id, current_user.id, liked)})
+
+    table = Like.__table__
+    result = db.session.execute(table.delete().where(
+        (table.c.user_id == current_user.id) & (table.c.post_id == post_id)))
+    liked = result.rowcount == 0
+    if liked:
+        db.session.execute(insert_ignore(table).values(
+            user_id=current_user.id, post_id=post_id, created_at=datetime.utcnow()))
+    db.session.commit()
+    return jsonify({'liked': liked, 'likes_count': count_likes(post_id, current_user.id, liked)})
 
-@app.route('/comment/<int:post_id>', methods=['POST'])
+@main.route('/comment/<int:post_id>', methods=['POST'])
 @login_required
 def add_comment(post_id):
     post = Post.query.get_or_404(post_id)
@@ -280,7 +596,7 @@ def add_comment(post_id):
         }
     })
 
-@app.route('/edit_profile', methods=['GET', 'POST'])
+@main.route('/edit_profile', methods=['GET', 'POST'])
 @login_required
 def edit_profile():
     if request.method == 'POST':
@@ -308,11 +624,52 @@ def edit_profile():
 
         db.session.commit()
         flash('Profile updated successfully!', 'success')
-        return redirect(url_for('profile', username=current_user.username))
+        return redirect(url_for('main.profile', username=current_user.username))
 
     return render_template('edit_profile.html')
 
+def create_app(config=None):
+    """Build the application. ``config`` may be a settings object or a dict."""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if isinstance(config, dict):
+        app.config.from_mapping(config)
+    elif config is not None:
+        app.config.from_object(config)
+
+    db.init_app(app)
+    bcrypt.init_app(app)
+    login_manager.init_app(app)
+    app.register_blueprint(main)
+    app.cli.add_command(upgrade_db_command)
+    app.extensions['profile_header_cache'] = ProfileHeaderCache(app.config['PROFILE_HEADER_TTL'])
+
+    if app.config['LIKE_WRITE_BEHIND']:
+        app.extensions['like_buffer'] = LikeBuffer(
+            app, app.config['LIKE_FLUSH_INTERVAL'], app.config['LIKE_FLUSH_MAX_PENDING'],
+            app.config['LIKE_FLUSH_MAX_ATTEMPTS'])
+    return app
+
+def warmup(app):
+    """Do one-off start-up work in the master process before workers fork.
+
+    Compiles every template, resolves the URL map, creates the upload folders
+    and opens one database connection so the dialect is initialised. The pool
+    is disposed afterwards; workers must not share sockets across fork.
+    """
+    with app.app_context():
+        for name in app.jinja_env.list_templates():
+            app.jinja_env.get_template(name)
+        app.url_map.update()
+        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+        os.makedirs(app.config['PROFILE_PICS_FOLDER'], exist_ok=True)
+        with db.engine.connect() as conn:
+            conn.execute(db.text('SELECT 1'))
+        db.engine.dispose()
+    return app
+
 if __name__ == '__main__':
+    app = create_app()
     with app.app_context():
         db.create_all()
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,15 @@
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+# Import the app (and run its warmup) once in the master, then fork workers
+preload_app = True
+
+def post_fork(server, worker):
+    # Workers must open their own database connections, never the master's
+    from app import db
+    from wsgi import app
+    with app.app_context():
+        db.engine.dispose()
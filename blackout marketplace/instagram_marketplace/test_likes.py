@@ -0,0 +1,122 @@
+import atexit
+
+import pytest
+
+import app as app_module
+from app import create_app, db, upgrade_db, Follow, Like, Post, User
+
+@pytest.fixture
+def app():
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'TESTING': True})
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='seller', email='seller@example.com', password='x'))
+        db.session.add(Post(image='shoes.jpg', description='Shoes', price=1500, user_id=1))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+@pytest.fixture
+def buffered_app(app):
+    # A long interval keeps the flusher thread out of the way; tests call flush() themselves
+    buffer = app_module.LikeBuffer(app, interval=3600, max_attempts=3)
+    app.extensions['like_buffer'] = buffer
+    yield app
+    # Whatever a test left queued must not be flushed at exit into a dropped database
+    atexit.unregister(buffer.flush)
+
+def signup(app):
+    client = app.test_client()
+    client.post('/signup', data={'username': 'fan', 'email': 'fan@example.com', 'password': 'secret'})
+    return client
+
+def like_rows(app):
+    with app.app_context():
+        return [(like.user_id, like.post_id) for like in Like.query.all()]
+
+def test_repeated_put_and_delete_are_idempotent(app):
+    client = signup(app)
+    assert client.put('/like/1').json == {'liked': True, 'likes_count': 1}
+    assert client.put('/like/1').json == {'liked': True, 'likes_count': 1}
+    assert like_rows(app) == [(2, 1)]
+
+    assert client.delete('/like/1').json == {'liked': False, 'likes_count': 0}
+    assert client.delete('/like/1').json == {'liked': False, 'likes_count': 0}
+    assert like_rows(app) == []
+
+    client.put('/follow/seller')
+    client.put('/follow/seller')
+    with app.app_context():
+        assert Follow.query.count() == 1
+
+def test_toggle_burst_flushes_to_final_state(buffered_app, monkeypatch):
+    client = signup(buffered_app)
+    writes = []
+    write_likes = app_module.write_likes
+    monkeypatch.setattr(app_module, 'write_likes', lambda changes: writes.append(dict(changes)) or write_likes(changes))
+
+    # The toggle reads the buffered state, so each POST flips the previous one
+    states = [client.post('/like/1').json['liked'] for _ in range(5)]
+    assert states == [True, False, True, False, True]
+    assert like_rows(buffered_app) == []
+
+    buffered_app.extensions['like_buffer'].flush()
+    assert writes == [{(2, 1): True}]
+    assert like_rows(buffered_app) == [(2, 1)]
+
+def test_failed_flush_requeues_without_overwriting_newer_state(buffered_app, monkeypatch):
+    buffer = buffered_app.extensions['like_buffer']
+    buffer.add(2, 1, True)
+    buffer.add(3, 1, True)
+
+    def fail(changes):
+        # The batch being written still counts as pending
+        assert buffer.pending(2, 1) is True
+        # A newer event arrives for one pair while the write is failing
+        buffer.add(2, 1, False)
+        raise RuntimeError('database is locked')
+    monkeypatch.setattr(app_module, 'write_likes', fail)
+    buffer.flush()
+
+    assert buffer.pending(2, 1) is False
+    assert buffer.pending(3, 1) is True
+
+def test_failing_change_is_dropped_after_max_attempts(buffered_app, monkeypatch):
+    buffer = buffered_app.extensions['like_buffer']
+    write_likes = app_module.write_likes
+
+    def fail_for_post_99(changes):
+        if any(post_id == 99 for _, post_id in changes):
+            raise RuntimeError('post is gone')
+        write_likes(changes)
+    monkeypatch.setattr(app_module, 'write_likes', fail_for_post_99)
+
+    buffer.add(1, 99, True)
+    buffer.add(1, 1, True)
+    buffer.flush()
+    # Retried row by row: the good change is written, the bad one waits for a retry
+    assert like_rows(buffered_app) == [(1, 1)]
+    assert buffer.pending(1, 99) is True
+
+    buffer.flush()
+    buffer.flush()
+    assert buffer.pending(1, 99) is None
+
+def test_upgrade_db_dedupes_and_adds_unique_keys(app):
+    with app.app_context():
+        # Recreate the like table as older versions did, without the unique key
+        db.session.execute(db.text('DROP TABLE "like"'))
+        db.session.execute(db.text(
+            'CREATE TABLE "like" (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, '
+            'post_id INTEGER NOT NULL, created_at DATETIME)'))
+        for _ in range(3):
+            db.session.execute(db.text('INSERT INTO "like" (user_id, post_id) VALUES (2, 1)'))
+        db.session.commit()
+        upgrade_db()
+        upgrade_db()
+    assert like_rows(app) == [(2, 1)]
+
+    client = signup(app)
+    assert client.put('/like/1').json == {'liked': True, 'likes_count': 1}
+    assert like_rows(app) == [(2, 1)]
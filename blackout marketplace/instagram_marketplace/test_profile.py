@@ -0,0 +1,58 @@
+import pytest
+
+from app import create_app, db, bcrypt, profile_header, profile_posts, Comment, Follow, Like, Post, User
+
+def make_app():
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'TESTING': True})
+    with app.app_context():
+        db.create_all()
+        password = bcrypt.generate_password_hash('secret').decode('utf-8')
+        db.session.add(User(username='seller', email='seller@example.com', password=password))
+        db.session.add(User(username='fan', email='fan@example.com', password=password))
+        db.session.commit()
+    return app
+
+@pytest.fixture
+def app():
+    app = make_app()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+def query_plan(query):
+    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    return [row[-1] for row in db.session.execute(db.text('EXPLAIN QUERY PLAN ' + sql))]
+
+def test_grid_counts_use_indexes(app):
+    with app.app_context():
+        db.session.add(Post(image='shoes.jpg', description='Shoes', price=1500, user_id=1))
+        db.session.add(Like(user_id=2, post_id=1))
+        db.session.add(Comment(text='Nice', user_id=2, post_id=1))
+        db.session.commit()
+        posts, _ = profile_posts(1)
+        assert (posts[0].likes_count, posts[0].comments_count) == (1, 1)
+
+        for model in (Like, Comment):
+            plan = query_plan(db.session.query(db.func.count(model.id)).filter(model.post_id == 1))
+            assert not any(step.startswith('SCAN') for step in plan), plan
+
+def test_header_cache_is_per_app(app):
+    other = make_app()
+    with app.app_context():
+        db.session.add(Follow(follower_id=2, followed_id=1))
+        db.session.commit()
+        assert profile_header(1, 2) == {'posts_count': 0, 'followers_count': 1, 'following_count': 0, 'is_following': True}
+    with other.app_context():
+        assert profile_header(1, 2)['followers_count'] == 0
+        db.drop_all()
+
+def test_follow_invalidates_cached_header(app):
+    client = app.test_client()
+    client.post('/login', data={'email': 'fan@example.com', 'password': 'secret'})
+
+    client.get('/profile/seller')
+    assert app.extensions['profile_header_cache'].get(1) is not None
+    client.put('/follow/seller')
+    with app.app_context():
+        assert app.extensions['profile_header_cache'].get(1) is None
+        assert profile_header(1, 2)['followers_count'] == 1
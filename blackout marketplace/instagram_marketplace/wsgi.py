@@ -0,0 +1,5 @@
+"""WSGI entry point, e.g. ``gunicorn -c gunicorn.conf.py wsgi:app``."""
+from app import create_app, warmup
+
+# With preload_app this runs once in the master and is inherited by every worker
+app = warmup(create_app())
@@ -1,33 +1,41 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+from flask import Flask, Blueprint, render_template, request, jsonify, session, redirect, url_for, flash, current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_mail import Mail, Message
-from datetime import datetime
+from flask.cli import with_appcontext
+from sqlalchemy import func
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from collections import defaultdict
+from datetime import datetime, timedelta
+import click
 import os
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key-here'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///marketplace.db'
-app.config['UPLOAD_FOLDER'] = 'static/uploads'
+class Config:
+    """Default settings, each overridable through an environment variable."""
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-here')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///marketplace.db')
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'static/uploads')
 
-db = SQLAlchemy(app)
-bcrypt = Bcrypt(app)
-login_manager = LoginManager(app)
-login_manager.login_view = 'login'
+    # Mail configuration
+    MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+    MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'true').lower() == 'true'
+    MAIL_USERNAME = os.environ.get('MAIL_USERNAME')  # Set your email
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')  # Set your app password
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_USERNAME')
 
-# Mail configuration
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')  # Set your email
-app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')  # Set your app password
-app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_USERNAME')
+    # Number of days of rollups shown on the seller dashboard
+    DASHBOARD_DAYS = int(os.environ.get('DASHBOARD_DAYS', 30))
 
-mail = Mail(app)
+# Extensions are created unbound and attached to an app in create_app()
+db = SQLAlchemy()
+bcrypt = Bcrypt()
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
+mail = Mail()
 
-# Ensure upload folder exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+main = Blueprint('main', __name__)
 
 # Models
 class User(db.Model, UserMixin):
@@ -66,6 +74,9 @@ class CartItem(db.Model):
     added_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Message(db.Model):
+    # Serves the per-conversation lookups in record_response()
+    __table_args__ = (db.Index('ix_message_pair_sent', 'sender_id', 'receiver_id', 'sent_at'),)
+
     id = db.Column(db.Integer, primary_key=True)
     sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     receiver_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -77,12 +88,158 @@ class Message(db.Model):
     sent_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_read = db.Column(db.Boolean, default=False)
 
+# Analytics rollups: one row per item (or seller) per day, kept current by
+# record_* below and rebuilt from the raw tables by rebuild_rollups()
+class ItemDailyStat(db.Model):
+    __table_args__ = (db.UniqueConstraint('item_id', 'day'), db.Index('ix_item_daily_stat_seller_day', 'seller_id', 'day'))
+
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
+    seller_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    inquiries = db.Column(db.Integer, nullable=False, default=0)
+    cart_adds = db.Column(db.Integer, nullable=False, default=0)
+
+class SellerDailyStat(db.Model):
+    __table_args__ = (db.UniqueConstraint('seller_id', 'day'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    seller_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    inquiries = db.Column(db.Integer, nullable=False, default=0)
+    cart_adds = db.Column(db.Integer, nullable=False, default=0)
+    responses = db.Column(db.Integer, nullable=False, default=0)
+    response_seconds = db.Column(db.Integer, nullable=False, default=0)  # Sum over responses
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
 
+# Analytics helpers
+def bump_stat(model, key, extra=None, **deltas):
+    """Add ``deltas`` to the rollup row identified by ``key`` in one upsert.
+
+    ``extra`` holds other columns that are only written when the row is
+    created. Runs inside the caller's transaction, so the rollup commits
+    together with the event that caused it.
+    """
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+    values = dict(key, **(extra or {}), **deltas)
+    increments = {column: table.c[column] + value for column, value in deltas.items()}
+    if dialect == 'mysql':
+        stmt = mysql.insert(table).values(**values).on_duplicate_key_update(**increments)
+    else:
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        stmt = insert(table).values(**values).on_conflict_do_update(
+            index_elements=list(key), set_=increments)
+    db.session.execute(stmt)
+
+def record_inquiry(item, sent_at):
+    day = sent_at.date()
+    bump_stat(ItemDailyStat, {'item_id': item.id, 'day': day}, {'seller_id': item.user_id}, inquiries=1)
+    bump_stat(SellerDailyStat, {'seller_id': item.user_id, 'day': day}, inquiries=1)
+
+def record_cart_add(item_id, seller_id, added_at):
+    day = added_at.date()
+    bump_stat(ItemDailyStat, {'item_id': item_id, 'day': day}, {'seller_id': seller_id}, cart_adds=1)
+    bump_stat(SellerDailyStat, {'seller_id': seller_id, 'day': day}, cart_adds=1)
+
+def record_response(responder_id, other_user_id, sent_at):
+    """Count a seller's reply if it answers messages not yet replied to.
+
+    Only replies to someone who has sent the responder an item inquiry count,
+    so buyers writing back to sellers are ignored. Response time runs from the
+    oldest unanswered message to ``sent_at``.
+    """
+    if responder_id == other_user_id:
+        return
+    is_seller = db.session.query(Message.query.filter(
+        (Message.sender_id == other_user_id) & (Message.receiver_id == responder_id) &
+        (Message.item_id != None)
+    ).exists()).scalar()
+    if not is_seller:
+        return
+    last_reply = db.session.query(func.max(Message.sent_at)).filter(
+        (Message.sender_id == responder_id) & (Message.receiver_id == other_user_id)
+    ).scalar_subquery()
+    waiting_since = db.session.query(func.min(Message.sent_at)).filter(
+        (Message.sender_id == other_user_id) & (Message.receiver_id == responder_id) &
+        ((Message.sent_at > last_reply) | (last_reply == None))
+    ).scalar()
+    if waiting_since:
+        bump_stat(SellerDailyStat, {'seller_id': responder_id, 'day': sent_at.date()},
+                  responses=1, response_seconds=int((sent_at - waiting_since).total_seconds()))
+
+def rebuild_rollups():
+    """Recompute every rollup row from Message, CartItem and Item.
+
+    Cart adds can only be rebuilt from carts as they are now: each CartItem
+    counts its quantity on the day the row was created, and items since
+    removed from a cart are not counted at all. A rebuild can therefore
+    report fewer cart adds than the live rollups did.
+    """
+    item_stats = defaultdict(lambda: {'inquiries': 0, 'cart_adds': 0})
+    seller_stats = defaultdict(lambda: {'inquiries': 0, 'cart_adds': 0, 'responses': 0, 'response_seconds': 0})
+    sellers = dict(db.session.query(Item.id, Item.user_id))
+
+    inquiries = db.session.query(Message.item_id, Message.sent_at).filter(Message.item_id != None)
+    for item_id, sent_at in inquiries.yield_per(1000):
+        if item_id in sellers:
+            item_stats[(item_id, sellers[item_id], sent_at.date())]['inquiries'] += 1
+            seller_stats[(sellers[item_id], sent_at.date())]['inquiries'] += 1
+
+    cart_adds = db.session.query(CartItem.item_id, CartItem.quantity, CartItem.added_at)
+    for item_id, quantity, added_at in cart_adds.yield_per(1000):
+        if item_id in sellers:
+            item_stats[(item_id, sellers[item_id], added_at.date())]['cart_adds'] += quantity or 1
+            seller_stats[(sellers[item_id], added_at.date())]['cart_adds'] += quantity or 1
+
+    # Replay conversations in order, as record_response() sees them.
+    # waiting[(a, b)] is when a's oldest unanswered message to b was sent;
+    # inquired holds (buyer, seller) pairs once the buyer has sent an item inquiry.
+    waiting = {}
+    inquired = set()
+    messages = db.session.query(
+        Message.sender_id, Message.receiver_id, Message.item_id, Message.sent_at
+    ).order_by(Message.sent_at, Message.id)
+    for sender_id, receiver_id, item_id, sent_at in messages.yield_per(1000):
+        if sender_id == receiver_id:
+            continue
+        since = waiting.pop((receiver_id, sender_id), None)
+        waiting.setdefault((sender_id, receiver_id), sent_at)
+        if since and (receiver_id, sender_id) in inquired:
+            stats = seller_stats[(sender_id, sent_at.date())]
+            stats['responses'] += 1
+            stats['response_seconds'] += int((sent_at - since).total_seconds())
+        if item_id is not None:
+            inquired.add((sender_id, receiver_id))
+
+    db.session.query(ItemDailyStat).delete()
+    db.session.query(SellerDailyStat).delete()
+    db.session.bulk_insert_mappings(ItemDailyStat, [
+        dict(item_id=item_id, seller_id=seller_id, day=day, **counts)
+        for (item_id, seller_id, day), counts in item_stats.items()
+    ])
+    db.session.bulk_insert_mappings(SellerDailyStat, [
+        dict(seller_id=seller_id, day=day, **counts)
+        for (seller_id, day), counts in seller_stats.items()
+    ])
+    db.session.commit()
+
+@click.command('rebuild-rollups')
+@with_appcontext
+def rebuild_rollups_command():
+    """Rebuild the seller analytics rollup tables.
+
+    Cart adds are rebuilt from current carts, so items since removed from a
+    cart are no longer counted.
+    """
+    rebuild_rollups()
+    click.echo('Analytics rollups rebuilt.')
+
 # Routes
-@app.route('/')
+@main.route('/')
 def home():
     search_term = request.args.get('search', '')
     if search_term:
@@ -95,7 +252,7 @@ def home():
         items = Item.query.all()
     return render_template('index.html', items=items)
 
-@app.route('/login', methods=['GET', 'POST'])
+@main.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         email = request.form.get('email')
@@ -103,11 +260,11 @@ def login():
         user = User.query.filter_by(email=email).first()
         if user and bcrypt.check_password_hash(user.password, password):
             login_user(user)
-            return redirect(url_for('home'))
+            return redirect(url_for('main.home'))
         flash('Login failed. Check email and password', 'danger')
     return render_template('login.html')
 
-@app.route('/signup', methods=['GET', 'POST'])
+@main.route('/signup', methods=['GET', 'POST'])
 def signup():
     if request.method == 'POST':
         name = request.form.get('name')
@@ -119,16 +276,16 @@ def signup():
         db.session.add(user)
         db.session.commit()
         login_user(user)
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     return render_template('signup.html')
 
-@app.route('/logout')
+@main.route('/logout')
 @login_required
 def logout():
     logout_user()
-    return redirect(url_for('home'))
+    return redirect(url_for('main.home'))
 
-@app.route('/add_item', methods=['GET', 'POST'])
+@main.route('/add_item', methods=['GET', 'POST'])
 @login_required
 def add_item():
     if request.method == 'POST':
@@ -141,17 +298,19 @@ def add_item():
         image_filename = None
         if image:
             image_filename = f"{datetime.now().timestamp()}_{image.filename}"
-            image.save(os.path.join(app.config['UPLOAD_FOLDER'], image_filename))
+            # The upload folder is created on first use rather than at import time
+            os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
+            image.save(os.path.join(current_app.config['UPLOAD_FOLDER'], image_filename))
 
         item = Item(title=title, description=description, price=float(price),
                    category=category, image=image_filename, user_id=current_user.id)
         db.session.add(item)
         db.session.commit()
         flash('Item added successfully!', 'success')
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     return render_template('add_item.html')
 
-@app.route('/cart')
+@main.route('/cart')
 @login_required
 def cart():
     cart_items = CartItem.query.filter_by(user_id=current_user.id).all()
@@ -164,7 +323,7 @@ def cart():
             total += item.price * cart_item.quantity
     return render_template('cart.html', items=items, total=total)
 
-@app.route('/add_to_cart/<int:item_id>')
+@main.route('/add_to_cart/<int:item_id>')
 @login_required
 def add_to_cart(item_id):
     cart_item = CartItem.query.filter_by(user_id=current_user.id, item_id=item_id).first()
@@ -173,34 +332,60 @@ def add_to_cart(item_id):
     else:
         cart_item = CartItem(user_id=current_user.id, item_id=item_id)
         db.session.add(cart_item)
+    seller_id = db.session.query(Item.user_id).filter_by(id=item_id).scalar()
+    if seller_id:
+        record_cart_add(item_id, seller_id, datetime.utcnow())
     db.session.commit()
     flash('Item added to cart!', 'success')
-    return redirect(url_for('home'))
+    return redirect(url_for('main.home'))
 
-@app.route('/remove_from_cart/<int:item_id>')
+@main.route('/remove_from_cart/<int:item_id>')
 @login_required
 def remove_from_cart(item_id):
     cart_item = CartItem.query.filter_by(user_id=current_user.id, item_id=item_id).first()
     if cart_item:
         db.session.delete(cart_item)
         db.session.commit()
-    return redirect(url_for('cart'))
+    return redirect(url_for('main.cart'))
 
-@app.route('/contact', methods=['GET', 'POST'])
+@main.route('/contact', methods=['GET', 'POST'])
 def contact():
     if request.method == 'POST':
         # Handle contact form
         flash('Message sent successfully!', 'success')
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     return render_template('contact.html')
 
-@app.route('/dashboard')
+@main.route('/dashboard')
 @login_required
 def dashboard():
     user_items = Item.query.filter_by(user_id=current_user.id).all()
-    return render_template('dashboard.html', items=user_items)
 
-@app.route('/mark_message_read/<int:message_id>', methods=['POST'])
+    # Reads at most DASHBOARD_DAYS rollup rows per item and for the seller
+    since = datetime.utcnow().date() - timedelta(days=current_app.config['DASHBOARD_DAYS'] - 1)
+    daily = SellerDailyStat.query.filter(
+        SellerDailyStat.seller_id == current_user.id, SellerDailyStat.day >= since
+    ).order_by(SellerDailyStat.day).all()
+    item_totals = dict((row.item_id, row) for row in db.session.query(
+        ItemDailyStat.item_id,
+        func.sum(ItemDailyStat.inquiries).label('inquiries'),
+        func.sum(ItemDailyStat.cart_adds).label('cart_adds')
+    ).filter(
+        ItemDailyStat.seller_id == current_user.id, ItemDailyStat.day >= since
+    ).group_by(ItemDailyStat.item_id))
+
+    responses = sum(d.responses for d in daily)
+    totals = {
+        'inquiries': sum(d.inquiries for d in daily),
+        'cart_adds': sum(d.cart_adds for d in daily),
+        'responses': responses,
+        'avg_response_minutes': round(sum(d.response_seconds for d in daily) / responses / 60) if responses else None
+    }
+    peak = max([d.inquiries + d.cart_adds for d in daily] + [1])
+    return render_template('dashboard.html', items=user_items, daily=daily, item_totals=item_totals,
+                           totals=totals, peak=peak, days=current_app.config['DASHBOARD_DAYS'])
+
+@main.route('/mark_message_read/<int:message_id>', methods=['POST'])
 @login_required
 def mark_message_read(message_id):
     message = Message.query.get_or_404(message_id)
@@ -209,12 +394,12 @@ def mark_message_read(message_id):
         db.session.commit()
     return '', 204
 
-@app.route('/messages')
+@main.route('/messages')
 @login_required
 def messages():
     return render_template('messages.html')
 
-@app.route('/api/conversations')
+@main.route('/api/conversations')
 @login_required
 def get_conversations():
     # Get all unique conversations for the current user
@@ -274,7 +459,7 @@ def get_conversations():
         } for conv in conversations]
     })
 
-@app.route('/api/conversation/<int:other_user_id>')
+@main.route('/api/conversation/<int:other_user_id>')
 @login_required
 def get_conversation(other_user_id):
     # Get all messages between current user and other user
@@ -294,7 +479,7 @@ def get_conversation(other_user_id):
         } for msg in messages]
     })
 
-@app.route('/api/mark_conversation_read/<int:other_user_id>', methods=['POST'])
+@main.route('/api/mark_conversation_read/<int:other_user_id>', methods=['POST'])
 @login_required
 def mark_conversation_read(other_user_id):
     # Mark all messages from other_user to current_user as read
@@ -306,7 +491,7 @@ def mark_conversation_read(other_user_id):
     db.session.commit()
     return jsonify({'success': True})
 
-@app.route('/api/send_message/<int:receiver_id>', methods=['POST'])
+@main.route('/api/send_message/<int:receiver_id>', methods=['POST'])
 @login_required
 def send_message(receiver_id):
     data = request.get_json()
@@ -318,14 +503,17 @@ def send_message(receiver_id):
     message = Message(
         sender_id=current_user.id,
         receiver_id=receiver_id,
-        message=message_text
+        subject=f"Message from {current_user.name}",
+        message=message_text,
+        sent_at=datetime.utcnow()
     )
+    record_response(current_user.id, receiver_id, message.sent_at)
     db.session.add(message)
     db.session.commit()
 
     return jsonify({'success': True})
 
-@app.route('/contact_seller/<int:item_id>', methods=['GET', 'POST'])
+@main.route('/contact_seller/<int:item_id>', methods=['GET', 'POST'])
 @login_required
 def contact_seller(item_id):
     item = Item.query.get_or_404(item_id)
@@ -341,9 +529,12 @@ def contact_seller(item_id):
             subject=f"Inquiry about: {item.title}",
             message=message_text,
             phone=phone,
-            email=current_user.email
+            email=current_user.email,
+            sent_at=datetime.utcnow()
         )
+        record_response(current_user.id, item.user_id, message.sent_at)
         db.session.add(message)
+        record_inquiry(item, message.sent_at)
         db.session.commit()
 
         # Send email notification
@@ -378,11 +569,46 @@ BLACKOUT Marketplace Team
             print(f"Email sending failed: {e}")
 
         flash('Message sent successfully! Check your Messages page to continue the conversation.', 'success')
-        return redirect(url_for('messages'))
+        return redirect(url_for('main.messages'))
 
     return render_template('contact_seller.html', item=item)
 
+def create_app(config=None):
+    """Build the application. ``config`` may be a settings object or a dict."""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if isinstance(config, dict):
+        app.config.from_mapping(config)
+    elif config is not None:
+        app.config.from_object(config)
+
+    db.init_app(app)
+    bcrypt.init_app(app)
+    login_manager.init_app(app)
+    mail.init_app(app)
+    app.register_blueprint(main)
+    app.cli.add_command(rebuild_rollups_command)
+    return app
+
+def warmup(app):
+    """Do one-off start-up work in the master process before workers fork.
+
+    Compiles every template, builds the URL matcher, creates the upload folder
+    and opens one database connection so the dialect is initialised. The pool
+    is disposed afterwards; workers must not share sockets across fork.
+    """
+    with app.app_context():
+        for name in app.jinja_env.list_templates():
+            app.jinja_env.get_template(name)
+        app.url_map.update()
+        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+        with db.engine.connect() as conn:
+            conn.execute(db.text('SELECT 1'))
+        db.engine.dispose()
+    return app
+
 if __name__ == '__main__':
+    app = create_app()
     with app.app_context():
         db.create_all()
         # Add sample data if database is empty
@@ -414,4 +640,4 @@ if __name__ == '__main__':
                 item = Item(**item_data)
                 db.session.add(item)
             db.session.commit()
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
\ No newline at end of file
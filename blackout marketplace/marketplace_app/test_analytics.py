@@ -0,0 +1,68 @@
+import re
+
+import pytest
+
+from app import create_app, db, bcrypt, rebuild_rollups, Item, User, ItemDailyStat, SellerDailyStat
+
+@pytest.fixture
+def app():
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'TESTING': True})
+    with app.app_context():
+        db.create_all()
+        password = bcrypt.generate_password_hash('secret').decode('utf-8')
+        db.session.add(User(name='Seller', email='seller@example.com', password=password))
+        db.session.add(User(name='Buyer', email='buyer@example.com', password=password))
+        db.session.add(Item(title='Logo design', description='Logos', price=50, category='graphic-design', user_id=1))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+def login(app, email):
+    client = app.test_client()
+    client.post('/login', data={'email': email, 'password': 'secret'})
+    return client
+
+def seller_stats(app):
+    with app.app_context():
+        return [(s.seller_id, s.inquiries, s.cart_adds, s.responses)
+                for s in SellerDailyStat.query.order_by(SellerDailyStat.seller_id)]
+
+def test_repeat_events_on_same_day_keep_item_totals(app):
+    buyer = login(app, 'buyer@example.com')
+    for _ in range(2):
+        buyer.post('/contact_seller/1', data={'message': 'Is this available?'})
+        buyer.get('/add_to_cart/1')
+
+    with app.app_context():
+        stat = ItemDailyStat.query.one()
+        assert (stat.seller_id, stat.inquiries, stat.cart_adds) == (1, 2, 2)
+
+    page = login(app, 'seller@example.com').get('/dashboard').get_data(as_text=True)
+    assert re.search(r'Last 30 days:</strong> 2 inquiries, 2 cart adds', page)
+
+def test_only_seller_replies_count_as_responses(app):
+    seller = login(app, 'seller@example.com')
+    buyer = login(app, 'buyer@example.com')
+
+    # The seller writes first: the buyer's inquiry answers it, but buyers are not counted
+    seller.post('/api/send_message/2', json={'message': 'Hello!'})
+    buyer.post('/contact_seller/1', data={'message': 'Is this available?'})
+    seller.post('/api/send_message/2', json={'message': 'Yes'})
+    buyer.post('/api/send_message/1', json={'message': 'Thanks'})
+    seller.post('/api/send_message/1', json={'message': 'Note to self'})
+
+    assert seller_stats(app) == [(1, 1, 0, 1)]
+
+def test_rebuild_matches_live_rollups(app):
+    seller = login(app, 'seller@example.com')
+    buyer = login(app, 'buyer@example.com')
+    buyer.post('/contact_seller/1', data={'message': 'Is this available?'})
+    buyer.get('/add_to_cart/1')
+    seller.post('/api/send_message/2', json={'message': 'Yes'})
+    buyer.post('/api/send_message/1', json={'message': 'Thanks'})
+
+    live = seller_stats(app)
+    with app.app_context():
+        rebuild_rollups()
+    assert seller_stats(app) == live